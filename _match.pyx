@@ -0,0 +1,36 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled matcher kernel for verify_patterns, for environments without numba.
+
+Build in place with:  cythonize -i _match.pyx
+
+verify_patterns prefers this extension when importable, then numba, then
+its pure-numpy path; all three give identical results.
+"""
+from libc.stdint cimport int8_t
+
+
+def match(const int8_t[:, ::1] grid_arr, const int8_t[:, ::1] pat_arr, int space):
+    """First (row, col) where pat_arr matches grid_arr, or (-1, -1)"""
+    cdef Py_ssize_t gh = grid_arr.shape[0]
+    cdef Py_ssize_t gw = grid_arr.shape[1]
+    cdef Py_ssize_t ph = pat_arr.shape[0]
+    cdef Py_ssize_t pw = pat_arr.shape[1]
+    cdef Py_ssize_t row, col, pr, pc
+    cdef int8_t v
+    cdef bint ok
+
+    for row in range(gh - ph + 1):
+        for col in range(gw - pw + 1):
+            ok = True
+            for pr in range(ph):
+                for pc in range(pw):
+                    v = grid_arr[row + pr, col + pc]
+                    if v == space or v != pat_arr[pr, pc]:
+                        ok = False
+                        break
+                if not ok:
+                    break
+            if ok:
+                return row, col
+    return -1, -1
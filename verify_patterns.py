@@ -2,9 +2,84 @@
 """
 Verify all test images contain the expected Anoto pattern
 """
+import functools
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+# int8 encoding for the arrow glyphs so pattern matching runs on
+# contiguous numpy arrays instead of per-cell unicode string compares
+LUT = {'↑': 0, '↓': 1, '←': 2, '→': 3, ' ': 4}
+ARROWS = ['↑', '↓', '←', '→', ' ']
+SPACE = LUT[' ']
+
+# Base for the Rabin-Karp row prefilter; all cell codes are < 7, so the
+# base-7 polynomial encodes a row slice injectively (no collisions)
+HASH_BASE = 7
+
+# Sorted code points of the five cell glyphs, with REMAP aligned so that
+# REMAP[searchsorted(SORTED_CODEPOINTS, ord(c))] == LUT[c]
+SORTED_CODEPOINTS = np.array(sorted(ord(c) for c in LUT), dtype=np.uint32)
+REMAP = np.array([LUT[chr(cp)] for cp in SORTED_CODEPOINTS], dtype=np.int8)
+
+TRANSFORM_NAMES = [
+    "Identity", "Rot90", "Rot180", "Rot270",
+    "FlipH", "FlipH+Rot90", "FlipH+Rot180", "FlipH+Rot270"
+]
+
+# Optional compiled backends for the cell-by-cell scan, resolved lazily
+# on first search so importing this module stays cheap (numba's own
+# import takes on the order of a second). Preference order: the Cython
+# extension (see _match.pyx; build with `cythonize -i _match.pyx`), then
+# a numba JIT kernel, then the numpy sliding-window path.
+_match_first = None
+_backend_resolved = False
+
+def _resolve_backend():
+    """Pick the fastest available matcher kernel on first use"""
+    global _match_first, _backend_resolved
+    if _backend_resolved:
+        return _match_first
+    _backend_resolved = True
+
+    try:
+        from _match import match as _match_first
+    except ImportError:
+        pass
+    else:
+        return _match_first
+
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True)
+    def match_first(grid_arr, pat_arr, space):
+        """First (row, col) where pat_arr matches grid_arr, or (-1, -1)"""
+        gh, gw = grid_arr.shape
+        ph, pw = pat_arr.shape
+        for row in range(gh - ph + 1):
+            for col in range(gw - pw + 1):
+                ok = True
+                for pr in range(ph):
+                    for pc in range(pw):
+                        v = grid_arr[row + pr, col + pc]
+                        if v == space or v != pat_arr[pr, pc]:
+                            ok = False
+                            break
+                    if not ok:
+                        break
+                if ok:
+                    return row, col
+        return -1, -1
+
+    _match_first = match_first
+    return _match_first
+
 # Expected pattern from the user
 EXPECTED_PATTERN = [
     ["↑", "↓", "←", "↓", "↓", "←", "↓"],
@@ -17,82 +92,86 @@ EXPECTED_PATTERN = [
     ["↑", "↓", "↓", "→", "→", "→", "←"]
 ]
 
-def rotate_90(grid):
-    """Rotate grid 90 degrees clockwise"""
-    h = len(grid)
-    w = len(grid[0]) if h > 0 else 0
-    rotated = [[' ' for _ in range(h)] for _ in range(w)]
-    for r in range(h):
-        for c in range(w):
-            rotated[c][h - 1 - r] = grid[r][c]
-    return rotated
-
-def flip_horizontal(grid):
-    """Flip grid horizontally"""
-    return [row[::-1] for row in grid]
-
-def flip_vertical(grid):
-    """Flip grid vertically"""
-    return grid[::-1]
-
-def all_transformations(grid):
-    """Generate all 8 transformations (rotations and flips)"""
-    transforms = []
-    current = grid
-    
-    # Original and 3 rotations
-    for _ in range(4):
-        transforms.append(current)
-        current = rotate_90(current)
-    
-    # Flipped and 3 rotations
-    current = flip_horizontal(grid)
-    for _ in range(4):
-        transforms.append(current)
-        current = rotate_90(current)
-    
-    return transforms
+def encode(grid):
+    """Encode a list-of-lists arrow grid as an int8 numpy array"""
+    # Flatten to one string and map code points to cell codes with a
+    # single searchsorted instead of a per-cell dict lookup
+    flat = ''.join(''.join(row) for row in grid)
+    ords = np.frombuffer(flat.encode('utf-32-le'), dtype=np.uint32)
+    # Reshape with an explicit width: -1 would fail on empty grids
+    width = len(grid[0]) if grid else 0
+    return REMAP[np.searchsorted(SORTED_CODEPOINTS, ords)].reshape(len(grid), width)
+
+def decode(arr):
+    """Decode an int8 numpy array back to a list-of-lists arrow grid"""
+    return [[ARROWS[v] for v in row] for row in arr]
+
+@functools.lru_cache(maxsize=8)
+def encoded_transformations(pattern_key):
+    """All 8 transformations of a pattern, encoded, in TRANSFORM_NAMES order
+
+    pattern_key is a tuple of row tuples so the result is cached across
+    calls; the same pattern is searched in every grid.
+    """
+    arr = encode(pattern_key)
+    # np.rot90 rotates counter-clockwise, so k=-1 is a clockwise rotation
+    return tuple(np.ascontiguousarray(np.rot90(arr, -k)) for k in range(4)) + \
+           tuple(np.ascontiguousarray(np.rot90(np.fliplr(arr), -k)) for k in range(4))
 
 def find_pattern_in_grid(grid, pattern):
     """Find pattern in grid with all transformations, returns (row, col, transform) if found, None otherwise"""
-    pattern_h = len(pattern)
-    pattern_w = len(pattern[0])
-    grid_h = len(grid)
-    grid_w = len(grid[0]) if grid_h > 0 else 0
-    
+    if not grid or not grid[0]:
+        return None
+
+    grid_arr = encode(grid)
+    grid_h, grid_w = grid_arr.shape
+
     # Try all transformations of the pattern
-    for transform_idx, transformed_pattern in enumerate(all_transformations(pattern)):
-        tp_h = len(transformed_pattern)
-        tp_w = len(transformed_pattern[0]) if tp_h > 0 else 0
-        
+    match_first = _resolve_backend()
+    pattern_key = tuple(tuple(row) for row in pattern)
+    for transform_idx, pat_arr in enumerate(encoded_transformations(pattern_key)):
+        tp_h, tp_w = pat_arr.shape
+
         if grid_h < tp_h or grid_w < tp_w:
             continue
-        
-        for row in range(grid_h - tp_h + 1):
-            for col in range(grid_w - tp_w + 1):
-                # Check if pattern matches at this position
-                match = True
-                for pr in range(tp_h):
-                    for pc in range(tp_w):
-                        grid_val = grid[row + pr][col + pc]
-                        pattern_val = transformed_pattern[pr][pc]
-                        # Skip spaces in grid
-                        if grid_val == ' ':
-                            match = False
-                            break
-                        if grid_val != pattern_val:
-                            match = False
-                            break
-                    if not match:
-                        break
-                if match:
-                    transform_names = [
-                        "Identity", "Rot90", "Rot180", "Rot270",
-                        "FlipH", "FlipH+Rot90", "FlipH+Rot180", "FlipH+Rot270"
-                    ]
-                    return (row, col, transform_names[transform_idx], transformed_pattern)
+
+        if match_first is not None:
+            row, col = match_first(grid_arr, pat_arr, SPACE)
+            if row >= 0:
+                return (row, col, TRANSFORM_NAMES[transform_idx], decode(pat_arr))
+            continue
+
+        # Rabin-Karp style prefilter: hash every width-tp_w row slice of
+        # the grid and keep only anchor positions whose top row hashes
+        # like the pattern's top row; the full window check then runs on
+        # those candidates alone instead of every position
+        powers = HASH_BASE ** np.arange(tp_w, dtype=np.int64)
+        row_wins = np.lib.stride_tricks.sliding_window_view(grid_arr, tp_w, axis=1)
+        row_hashes = row_wins.astype(np.int64) @ powers
+        target = pat_arr[0].astype(np.int64) @ powers
+        anchors = np.argwhere(row_hashes[:grid_h - tp_h + 1] == target)
+        if not anchors.size:
+            continue
+
+        # Full check at the surviving anchors; a window only matches if
+        # every cell equals the pattern and none of them is a space
+        windows = np.lib.stride_tricks.sliding_window_view(grid_arr, (tp_h, tp_w))
+        candidates = windows[anchors[:, 0], anchors[:, 1]]
+        matches = ((candidates == pat_arr) & (candidates != SPACE)).all(axis=(-2, -1))
+        if matches.any():
+            # anchors are in row-major order, so the first True is the
+            # same first match the exhaustive scan would have returned
+            row, col = (int(v) for v in anchors[np.argmax(matches)])
+            return (row, col, TRANSFORM_NAMES[transform_idx], decode(pat_arr))
     return None
 
+def verify_file(minified_file):
+    """Worker: load one minified grid and search it for the expected pattern"""
+    with open(minified_file, 'r', encoding='utf-8') as f:
+        grid = json.load(f)
+    result = find_pattern_in_grid(grid, EXPECTED_PATTERN)
+    return result, len(grid), len(grid[0]) if grid else 0
+
 def main():
     # Load all minified JSON files
     minified_files = sorted(Path('.').glob('anoto_*_minified.json'))
@@ -106,18 +185,16 @@ def main():
     
     found_count = 0
     not_found = []
-    
-    for minified_file in minified_files:
+
+    # The files are independent, so verify them across all cores; printing
+    # stays here so the report keeps its original order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        outcomes = list(executor.map(verify_file, minified_files))
+
+    for minified_file, (result, grid_h, grid_w) in zip(minified_files, outcomes):
         # Extract image number from filename
         img_num = minified_file.stem.split('_')[1]
-        
-        # Load the minified grid
-        with open(minified_file, 'r', encoding='utf-8') as f:
-            grid = json.load(f)
-        
-        # Find the pattern
-        result = find_pattern_in_grid(grid, EXPECTED_PATTERN)
-        
+
         if result:
             row, col, transform, transformed_pattern = result
             found_count += 1
@@ -132,7 +209,7 @@ def main():
             not_found.append(img_num)
             print(f"\n✗ Image {img_num}: NOT FOUND")
             print(f"  File: {minified_file}")
-            print(f"  Grid size: {len(grid)}x{len(grid[0]) if grid else 0}")
+            print(f"  Grid size: {grid_h}x{grid_w}")
     
     print("\n" + "=" * 80)
     print(f"\nSummary:")